@@ -4,13 +4,14 @@ Example:
     python crawl.py --url=https://news.ycombinator.com/item\?id\=40846428 --output_path=hn_comments.json
 """
 
-import requests
+import sys
 import time
 import argparse
 import json
 import logging
 from urllib.parse import urlparse, parse_qs
 from tqdm import tqdm
+import tracing
 
 BASE_URL = "https://hacker-news.firebaseio.com/v0/item/{}.json"
 
@@ -20,8 +21,16 @@ logging.basicConfig(
 
 
 def get_item(item_id):
-    response = requests.get(BASE_URL.format(item_id))
-    return response.json()
+    # Imported here so `--help` and other subcommands don't pay for it.
+    import requests
+
+    with tracing.span("crawl.get_item", id=item_id):
+        response = requests.get(BASE_URL.format(item_id))
+    with tracing.span("crawl.parse_json"):
+        item = response.json()
+    tracing.count("crawl.items")
+    tracing.count("crawl.bytes", len(response.content))
+    return item
 
 
 def get_top_level_comments(story_id):
@@ -40,7 +49,8 @@ def get_top_level_comments(story_id):
         comment = get_item(comment_id)
         if comment and comment["type"] == "comment":
             top_level_comments.append(comment)
-        time.sleep(0.1)  # Be nice to the API
+        with tracing.span("crawl.sleep"):
+            time.sleep(0.1)  # Be nice to the API
 
     return top_level_comments, story
 
@@ -61,38 +71,50 @@ def extract_item_id(url):
     raise ValueError("Could not extract item ID from URL")
 
 
-def main():
-    parser = argparse.ArgumentParser(
-        description="Fetch top-level comments from a Hacker News post."
-    )
-    parser.add_argument("--url", required=True, help="URL of the Hacker News post")
-    parser.add_argument("--output_path", help="Path to save the output JSON file")
-    args = parser.parse_args()
+def crawl(url, output_path=None):
+    story_id = extract_item_id(url)
+    logging.info(f"Extracting comments for story ID: {story_id}")
 
-    try:
-        story_id = extract_item_id(args.url)
-        logging.info(f"Extracting comments for story ID: {story_id}")
+    comments, post = get_top_level_comments(story_id)
 
-        comments, post = get_top_level_comments(story_id)
+    output = {"post": post, "comments": comments}
 
-        output = {"post": post, "comments": comments}
+    if output_path:
+        with tracing.span("crawl.write_output"), open(
+            output_path, "w", encoding="utf-8"
+        ) as f:
+            json.dump(output, f, ensure_ascii=False, indent=2)
+        logging.info(f"Output saved to {output_path}")
+    else:
+        print(json.dumps(output, ensure_ascii=False, indent=2))
 
-        if args.output_path:
-            with open(args.output_path, "w", encoding="utf-8") as f:
-                json.dump(output, f, ensure_ascii=False, indent=2)
-            logging.info(f"Output saved to {args.output_path}")
-        else:
-            print(json.dumps(output, ensure_ascii=False, indent=2))
+    logging.info(f"Finished processing. Found {len(comments)} top-level comments.")
 
-        logging.info(f"Finished processing. Found {len(comments)} top-level comments.")
 
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(
+        prog=prog, description="Fetch top-level comments from a Hacker News post."
+    )
+    parser.add_argument("--url", required=True, help="URL of the Hacker News post")
+    parser.add_argument("--output_path", help="Path to save the output JSON file")
+    tracing.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    import requests
+
+    try:
+        with tracing.session(args.trace, args.profile):
+            crawl(args.url, args.output_path)
     except ValueError as e:
         logging.error(f"Error: {str(e)}")
+        return 1
     except requests.RequestException as e:
         logging.error(f"Error fetching data: {str(e)}")
+        return 1
     except IOError as e:
         logging.error(f"Error writing to file: {str(e)}")
+        return 1
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -1,14 +1,19 @@
 import os
+import sys
 import json
 import argparse
 import logging
+from functools import lru_cache
 from tqdm import tqdm
-import instructor
-from anthropic import Anthropic
-from typing import Dict, Any, List
-from models import JobPosting
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Sequence
+from scheduler import PRIORITIES, Scheduler, estimate_tokens
+import tracing
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import threading
+import time
+
+if TYPE_CHECKING:
+    import instructor
 
 LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
 logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -19,12 +24,83 @@ Focus on all fields defined in the JobPosting model, paying special attention to
 industry, startup funding stage, ML/AI involvement, datacenter operations, and experience requirements. 
 Provide concise and accurate information for each field."""
 
+MAX_TOKENS = 1024
+
+# The Anthropic SDK's default. Timeouts are retried too, so a request given
+# `timeout` can take up to (API_MAX_RETRIES + 1) * timeout.
+API_MAX_RETRIES = 2
+
+# Shortest per-attempt timeout given to requests dispatched near the deadline.
+MIN_TIMEOUT = 1.0
+
+
+@lru_cache(maxsize=None)
+def prompt_tokens() -> int:
+    """Prompt and tool schema sent along with every comment, used for budgeting."""
+    from models import JobPosting
+
+    return estimate_tokens(SYSTEM_PROMPT + json.dumps(JobPosting.model_json_schema()))
+
+
+def make_client() -> "instructor.Instructor":
+    # The SDKs take seconds to import, so only load them when the API is used.
+    import instructor
+    from anthropic import Anthropic
+
+    client = instructor.from_anthropic(Anthropic(max_retries=API_MAX_RETRIES))
+    client.on("completion:kwargs", _on_request)
+    client.on("completion:response", _on_response)
+    return client
+
+
+# instructor runs hooks on the requesting thread, around each API attempt and
+# before parsing the response, which lets the trace tell API latency apart
+# from pydantic validation.
+_attempt = threading.local()
+
+
+def _on_request(*args, **kwargs):
+    _attempt.requested = time.perf_counter()
+
+
+def _on_response(response):
+    # The client may also be used outside process_comment, so nothing here
+    # can assume the per-comment attributes were set.
+    _attempt.responded = time.perf_counter()
+    requested = getattr(_attempt, "requested", None)
+    if requested is None:
+        return
+    comment_id = getattr(_attempt, "comment_id", None)
+    args = {} if comment_id is None else {"id": comment_id}
+    tracing.record("extract.api", requested, _attempt.responded, **args)
+
 
-def process_job_posting(client: Any, comment: str) -> Dict[str, Any]:
+class LazyClient:
+    """Stands in for the instructor client and creates it on first use, so
+    runs served entirely from the cache never import the Anthropic SDK."""
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        with self._lock:
+            if self._client is None:
+                self._client = make_client()
+        return getattr(self._client, name)
+
+
+def process_job_posting(
+    client: Any, comment: str, timeout: Optional[float] = None
+) -> Dict[str, Any]:
+    from models import JobPosting
+
+    # Only passed when set, so the SDK's default timeout applies otherwise.
+    options = {} if timeout is None else {"timeout": timeout}
     try:
         resp = client.messages.create(
             model="claude-3-5-sonnet-20240620",
-            max_tokens=1024,
+            max_tokens=MAX_TOKENS,
             messages=[
                 {
                     "role": "user",
@@ -38,6 +114,7 @@ Provide the extracted information as a JSON object matching the JobPosting model
                 }
             ],
             response_model=JobPosting,
+            **options,
         )
         return resp.model_dump()
     except Exception as e:
@@ -57,33 +134,56 @@ def load_cache(output_file: str) -> Dict[str, Any]:
         return {}
 
 
-def process_comment(client, comment, cache):
+def process_comment(client, comment, cache, timeout=None):
     comment_id = comment["id"]
     if comment_id in cache and "error" not in cache[comment_id]:
         return comment, cache[comment_id], True
     else:
         original_text = comment.get("text", "")
-        classified_data = process_job_posting(client, original_text)
+        _attempt.comment_id = comment_id
+        _attempt.responded = None
+        with tracing.profile_thread(), tracing.span("extract.comment", id=comment_id):
+            classified_data = process_job_posting(client, original_text, timeout)
+        if _attempt.responded is not None:
+            tracing.record(
+                "extract.validate",
+                _attempt.responded,
+                time.perf_counter(),
+                id=comment_id,
+            )
+        tracing.count("extract.api_calls")
+        if "error" in classified_data:
+            tracing.count("extract.errors")
         return comment, classified_data, False
 
 
 def save_results(
-    temp_file: str, post_data: Dict[str, Any], classified_comments: List[Dict[str, Any]]
+    temp_file: str,
+    post_data: Dict[str, Any],
+    classified_comments: List[Dict[str, Any]],
+    pending_ids: Sequence[Any] = (),
 ):
     output_data = {"post": post_data, "classified_comments": classified_comments}
-    with open(temp_file, "w") as f:
-        json.dump(output_data, f, indent=2)
+    if pending_ids:
+        output_data["pending_comment_ids"] = list(pending_ids)
+    with tracing.span("extract.save_results", rows=len(classified_comments)):
+        with open(temp_file, "w") as f:
+            json.dump(output_data, f, indent=2)
+    tracing.count("extract.saves")
     logging.info(f"Intermediate results saved to {temp_file}")
 
 
 def classify_jobs(
-    client: instructor.Instructor,
+    client: "instructor.Instructor",
     input_file: str,
     output_file: str,
     limit: int = 0,
     max_workers: int = 10,
+    priority: str = "file",
+    max_cost: float = 0.0,
+    deadline: float = 0.0,
 ):
-    with open(input_file, "r") as f:
+    with tracing.span("extract.load_input"), open(input_file, "r") as f:
         data = json.load(f)
 
     comments = data["comments"]
@@ -91,7 +191,8 @@ def classify_jobs(
         comments = comments[:limit]
 
     temp_file = f"{output_file}.temp"
-    cache = load_cache(output_file)
+    with tracing.span("extract.load_cache"):
+        cache = load_cache(output_file)
     classified_comments = []
     successful_classifications = 0
     errors = 0
@@ -99,46 +200,94 @@ def classify_jobs(
     processed_count = 0
     save_lock = threading.Lock()
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = [
-            executor.submit(process_comment, client, comment, cache)
-            for comment in comments
-        ]
-
-        pbar = tqdm(total=len(comments), desc="Classifying job postings")
-        for future in as_completed(futures):
-            original, classified_data, is_cached = future.result()
-
-            if is_cached:
-                cached_results += 1
-            elif "error" in classified_data:
-                errors += 1
-            else:
-                successful_classifications += 1
-
+    # Cache hits cost nothing, so only the remaining comments go through the
+    # scheduler and count against the budget and deadline.
+    uncached = []
+    for comment in comments:
+        if comment["id"] in cache and "error" not in cache[comment["id"]]:
             classified_comments.append(
-                {"original": original, "classified": classified_data}
+                {"original": comment, "classified": cache[comment["id"]]}
             )
+            cached_results += 1
+        else:
+            uncached.append(comment)
+    tracing.count("extract.cache_hits", cached_results)
+    scheduler = Scheduler(
+        uncached,
+        priority=priority,
+        max_cost=max_cost,
+        deadline=deadline,
+        prompt_tokens=prompt_tokens() if uncached else 0,
+        max_output_tokens=MAX_TOKENS,
+    )
 
-            processed_count += 1
-            if processed_count % 10 == 0:
-                with save_lock:
-                    save_results(temp_file, data["post"], classified_comments)
-
-            pbar.update(1)
-            pbar.set_postfix(
-                {
-                    "Successful": successful_classifications,
-                    "Errors": errors,
-                    "Cached": cached_results,
-                },
-                refresh=True,
-            )
+    pbar = tqdm(total=len(comments), desc="Classifying job postings")
+    pbar.update(cached_results)
 
-        pbar.close()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = set()
+
+        def dispatch():
+            while len(in_flight) < max_workers:
+                comment = scheduler.next()
+                if comment is None:
+                    return
+                # Spread what is left of the deadline over every attempt the
+                # SDK may make, so running requests don't outlive it.
+                remaining = scheduler.remaining()
+                timeout = None
+                if remaining is not None:
+                    timeout = max(remaining / (API_MAX_RETRIES + 1), MIN_TIMEOUT)
+                in_flight.add(
+                    executor.submit(process_comment, client, comment, cache, timeout)
+                )
+
+        dispatch()
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                in_flight.remove(future)
+                original, classified_data, _ = future.result()
+                scheduler.settle(original, json.dumps(classified_data))
+
+                if "error" in classified_data:
+                    errors += 1
+                else:
+                    successful_classifications += 1
+
+                classified_comments.append(
+                    {"original": original, "classified": classified_data}
+                )
+
+                processed_count += 1
+                if processed_count % 10 == 0:
+                    with save_lock:
+                        save_results(temp_file, data["post"], classified_comments)
+
+                pbar.update(1)
+                pbar.set_postfix(
+                    {
+                        "Successful": successful_classifications,
+                        "Errors": errors,
+                        "Cached": cached_results,
+                        "Cost": f"${scheduler.spent:.2f}",
+                    },
+                    refresh=True,
+                )
+            dispatch()
+
+    pbar.close()
+
+    pending_ids = [comment["id"] for comment in scheduler.pending()]
+    if pending_ids:
+        logging.warning(
+            f"Stopped dispatching ({scheduler.stop_reason}), "
+            f"{len(pending_ids)} comments left pending. "
+            f"Re-run with the same --output to resume."
+        )
 
     data["post"].pop("kids", None)  # clean unnecessary data
-    save_results(temp_file, data["post"], classified_comments)
+    save_results(temp_file, data["post"], classified_comments, pending_ids)
 
     # Rename temp file to final output file
     os.replace(temp_file, output_file)
@@ -146,22 +295,14 @@ def classify_jobs(
     logging.info(
         f"Classification complete. Total: {len(classified_comments)}, "
         f"Successful: {successful_classifications}, Errors: {errors}, "
-        f"Cached: {cached_results}. Final output written to {output_file}"
+        f"Cached: {cached_results}, Pending: {len(pending_ids)}, "
+        f"Estimated cost: ${scheduler.spent:.2f}. "
+        f"Final output written to {output_file}"
     )
 
 
-def main():
-    parser = argparse.ArgumentParser(
-        description="Classify job postings from a JSON file."
-    )
-    parser.add_argument(
-        "--input",
-        required=True,
-        help="Path to the input JSON file, created by crawl.py",
-    )
-    parser.add_argument(
-        "--output", required=True, help="Path to save the output JSON file"
-    )
+def add_arguments(parser):
+    """Options for classify_jobs, shared with `hnjobs pipeline`."""
     parser.add_argument(
         "--limit",
         type=int,
@@ -174,16 +315,61 @@ def main():
         default=10,
         help="Number of worker threads to use",
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--priority",
+        choices=sorted(PRIORITIES),
+        default="file",
+        help="Order in which comments are sent to the API",
+    )
+    parser.add_argument(
+        "--max_cost",
+        type=float,
+        default=0.0,
+        help="Estimated spend limit in USD, 0 for no limit",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        default=0.0,
+        help="Stop dispatching new requests after this many seconds and time out "
+        "running ones by then, 0 for no limit",
+    )
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description="Classify job postings from a JSON file."
+    )
+    parser.add_argument(
+        "--input",
+        required=True,
+        help="Path to the input JSON file, created by crawl.py",
+    )
+    parser.add_argument(
+        "--output", required=True, help="Path to save the output JSON file"
+    )
+    add_arguments(parser)
+    tracing.add_arguments(parser)
+    args = parser.parse_args(argv)
     logging.info(f"args: {args}")
 
     try:
-        anthropic_client = Anthropic()
-        client = instructor.from_anthropic(anthropic_client)
-        classify_jobs(client, args.input, args.output, args.limit, args.workers)
+        with tracing.session(args.trace, args.profile):
+            classify_jobs(
+                LazyClient(),
+                args.input,
+                args.output,
+                args.limit,
+                args.workers,
+                args.priority,
+                args.max_cost,
+                args.deadline,
+            )
     except Exception as e:
         logging.error(f"An error occurred: {str(e)}")
+        return 1
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -1,10 +1,22 @@
 import unittest
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 import json
+import os
 import tempfile
-from extractor import process_job_posting, load_cache, classify_jobs
+import threading
+import warnings
+from extractor import (
+    process_job_posting,
+    process_comment,
+    load_cache,
+    classify_jobs,
+    make_client,
+)
 from models import JobPosting
+import anthropic
+import extractor
 import instructor
+import tracing
 
 
 class TestExtractor(unittest.TestCase):
@@ -114,6 +126,134 @@ To apply, email alexander [at] hatchet [dot] run"""
                 ["Founding Engineer"],
             )
 
+    def test_classify_jobs_budget_resume(self):
+        mock_client = Mock(spec=instructor.Instructor)
+        mock_client.messages.create.return_value = self.sample_job_posting
+        comments = [
+            {"id": i, "text": f"Company {i} | Remote<p>{self.sample_comment}"}
+            for i in range(30)
+        ]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            input_file = os.path.join(tmp, "raw.json")
+            output_file = os.path.join(tmp, "classified.json")
+            with open(input_file, "w") as f:
+                json.dump({"comments": comments, "post": {"title": "Test"}}, f)
+
+            classify_jobs(
+                mock_client, input_file, output_file, max_workers=3, max_cost=0.05
+            )
+            with open(output_file) as f:
+                result = json.load(f)
+            pending = result["pending_comment_ids"]
+            done = [c["original"]["id"] for c in result["classified_comments"]]
+            self.assertTrue(pending)
+            # Worst-case reservations of running requests must not end the run
+            # while settled spend still leaves room.
+            self.assertGreater(len(done), 2)
+            self.assertEqual(sorted(done + pending), list(range(30)))
+            first_run_calls = mock_client.messages.create.call_count
+
+            classify_jobs(mock_client, input_file, output_file, max_workers=3)
+            with open(output_file) as f:
+                result = json.load(f)
+            self.assertNotIn("pending_comment_ids", result)
+            self.assertEqual(len(result["classified_comments"]), 30)
+            self.assertEqual(
+                mock_client.messages.create.call_count - first_run_calls,
+                len(pending),
+            )
+
+    def test_deadline_sets_request_timeout(self):
+        mock_client = Mock(spec=instructor.Instructor)
+        mock_client.messages.create.return_value = self.sample_job_posting
+
+        with tempfile.TemporaryDirectory() as tmp:
+            input_file = os.path.join(tmp, "raw.json")
+            with open(input_file, "w") as f:
+                json.dump(
+                    {"comments": [{"id": 1, "text": "A"}], "post": {"title": "T"}}, f
+                )
+
+            classify_jobs(mock_client, input_file, os.path.join(tmp, "a.json"))
+            self.assertNotIn("timeout", mock_client.messages.create.call_args.kwargs)
+
+            classify_jobs(
+                mock_client, input_file, os.path.join(tmp, "b.json"), deadline=60
+            )
+            timeout = mock_client.messages.create.call_args.kwargs["timeout"]
+            # Every attempt the SDK may make has to fit before the deadline.
+            self.assertLessEqual(timeout * (extractor.API_MAX_RETRIES + 1), 60)
+            self.assertGreater(timeout, 0)
+
+    def hooked_client(self):
+        """A real instructor client, with hooks, over a fake Anthropic API."""
+        message = anthropic.types.Message.model_validate(
+            {
+                "id": "msg",
+                "type": "message",
+                "role": "assistant",
+                "model": "claude-3-5-sonnet-20240620",
+                "stop_reason": "tool_use",
+                "stop_sequence": None,
+                "usage": {"input_tokens": 1, "output_tokens": 1},
+                "content": [
+                    {
+                        "type": "tool_use",
+                        "id": "tool",
+                        "name": "JobPosting",
+                        "input": self.sample_job_posting.model_dump(),
+                    }
+                ],
+            }
+        )
+
+        class FakeAnthropic(anthropic.Anthropic):
+            def __init__(self, **kwargs):
+                super().__init__(api_key="test", **kwargs)
+                self.messages.create = Mock(return_value=message)
+
+        with patch("anthropic.Anthropic", FakeAnthropic):
+            return make_client()
+
+    def test_hooked_client_outside_process_comment(self):
+        client = self.hooked_client()
+        results = []
+        # A fresh thread has none of process_comment's per-thread state.
+        worker = threading.Thread(
+            target=lambda: results.append(
+                process_job_posting(client, self.sample_comment)
+            )
+        )
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            worker.start()
+            worker.join()
+
+        self.assertEqual(results[0]["company_name"], "Hatchet")
+        self.assertEqual([str(w.message) for w in caught], [])
+
+    def test_trace_splits_api_and_validation(self):
+        client = self.hooked_client()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            trace_file = os.path.join(tmp, "trace.json")
+            with tracing.session(trace_file):
+                _, classified, _ = process_comment(
+                    client, {"id": 1, "text": self.sample_comment}, {}
+                )
+            with open(trace_file) as f:
+                events = json.load(f)["traceEvents"]
+
+        self.assertEqual(classified["company_name"], "Hatchet")
+        spans = {e["name"]: e for e in events if e["ph"] == "X"}
+        self.assertEqual(
+            sorted(spans), ["extract.api", "extract.comment", "extract.validate"]
+        )
+        api, validate = spans["extract.api"], spans["extract.validate"]
+        self.assertLessEqual(api["ts"] + api["dur"], validate["ts"])
+        self.assertEqual(validate["args"], {"id": 1})
+
 
 if __name__ == "__main__":
     unittest.main()
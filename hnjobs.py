@@ -0,0 +1,147 @@
+"""
+Single entry point for crawling, extracting and exporting "Who is hiring" posts.
+Example:
+    python hnjobs.py pipeline --url https://news.ycombinator.com/item\\?id\\=41129813 --prefix 202408 --workers 5
+    python hnjobs.py extract --input 202408_raw.json --output 202408_classified.json
+    python hnjobs.py startup
+
+Subcommands are looked up by name and their modules imported only when run,
+so `hnjobs export` never loads the Anthropic SDK and `hnjobs --help` loads
+none of the subcommand modules.
+"""
+
+import argparse
+import importlib
+import logging
+import os
+import sys
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# name -> (module, function, help); a module of None means this file.
+COMMANDS = {
+    "crawl": ("crawl", "main", "Download top-level comments of a Hacker News post"),
+    "extract": ("extractor", "main", "Classify job postings with the Anthropic API"),
+    "export": ("write_jobs_to_csv", "main", "Convert classified postings to CSV"),
+    "pipeline": (None, "pipeline", "Run crawl, extract and export for one post"),
+    "startup": (None, "startup", "Measure cold-start time of each subcommand"),
+}
+
+
+def pipeline(argv=None, prog=None):
+    import crawl
+    import extractor
+    import tracing
+    import write_jobs_to_csv
+
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description="Crawl a Hacker News post, classify its comments and write a CSV.",
+    )
+    parser.add_argument("--url", required=True, help="URL of the Hacker News post")
+    parser.add_argument(
+        "--prefix",
+        required=True,
+        help="Output prefix, writes <prefix>_raw.json, <prefix>_classified.json "
+        "and <prefix>_classified.csv",
+    )
+    extractor.add_arguments(parser)
+    write_jobs_to_csv.add_arguments(parser)
+    tracing.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    raw_file = f"{args.prefix}_raw.json"
+    classified_file = f"{args.prefix}_classified.json"
+    csv_file = f"{args.prefix}_classified.csv"
+
+    try:
+        with tracing.session(args.trace, args.profile):
+            crawl.crawl(args.url, raw_file)
+            extractor.classify_jobs(
+                extractor.LazyClient(),
+                raw_file,
+                classified_file,
+                args.limit,
+                args.workers,
+                args.priority,
+                args.max_cost,
+                args.deadline,
+            )
+            write_jobs_to_csv.json_to_csv(classified_file, csv_file, args.validate)
+    except Exception as e:
+        logging.error(f"Pipeline failed: {str(e)}")
+        return 1
+
+
+def parse_importtime(stderr: str):
+    """Return (total ms, [(ms, module)]) for the top-level imports in -X importtime output."""
+    top_level = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit() or name[1:2] == " ":
+            continue
+        top_level.append((int(cumulative) / 1000, name.strip()))
+    return sum(ms for ms, _ in top_level), sorted(top_level, reverse=True)
+
+
+def startup(argv=None, prog=None):
+    import statistics
+    import subprocess
+    import time
+
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description="Report cold-start time of `<subcommand> --help` for each subcommand.",
+    )
+    parser.add_argument(
+        "--runs", type=int, default=5, help="Runs per subcommand, the median is reported"
+    )
+    args = parser.parse_args(argv)
+
+    script = os.path.abspath(__file__)
+    print(f"{'command':<10}{'wall ms':>10}{'import ms':>12}  heaviest imports")
+    for command in [None] + [name for name in COMMANDS if name != "startup"]:
+        cmd = [sys.executable, script] + ([command] if command else []) + ["--help"]
+        walls = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            subprocess.run(cmd, capture_output=True, check=True)
+            walls.append((time.perf_counter() - start) * 1000)
+        profiled = subprocess.run(
+            [sys.executable, "-X", "importtime"] + cmd[1:],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        total, top_level = parse_importtime(profiled.stderr)
+        heaviest = ", ".join(f"{name} {ms:.0f}" for ms, name in top_level[:3])
+        print(
+            f"{command or '(none)':<10}{statistics.median(walls):>10.0f}"
+            f"{total:>12.0f}  {heaviest}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="hnjobs",
+        description="Crawl, classify and export Hacker News 'Who is hiring' posts. "
+        "Run `hnjobs <command> --help` for the options of each command.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, (_, _, description) in COMMANDS.items():
+        subparsers.add_parser(name, help=description, add_help=False)
+    args, rest = parser.parse_known_args(argv)
+
+    module_name, function, _ = COMMANDS[args.command]
+    if module_name is None:
+        run = globals()[function]
+    else:
+        run = getattr(importlib.import_module(module_name), function)
+    return run(rest, prog=f"hnjobs {args.command}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
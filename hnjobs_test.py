@@ -0,0 +1,160 @@
+import unittest
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from unittest.mock import patch
+from hnjobs import main, parse_importtime, pipeline
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestHnjobs(unittest.TestCase):
+
+    def run_hnjobs(self, *args):
+        """Run a subcommand in a fresh interpreter and return the loaded heavy modules."""
+        code = (
+            "import json, sys, hnjobs; hnjobs.main(sys.argv[1:]); "
+            "heavy = ('anthropic', 'instructor', 'pydantic'); "
+            "print(json.dumps([m for m in heavy if m in sys.modules]))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code, *args],
+            cwd=HERE,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def test_parse_importtime(self):
+        stderr = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       100 |        100 |   _io\n"
+            "import time:       500 |       1500 | json\n"
+            "import time:      2000 |       2000 | tracing\n"
+        )
+        total, top_level = parse_importtime(stderr)
+        self.assertEqual(total, 3.5)
+        self.assertEqual(top_level, [(2.0, "tracing"), (1.5, "json")])
+
+    def test_cache_only_runs_skip_sdk(self):
+        classified = {
+            "company_name": "Hatchet",
+            "positions": ["Founding Engineer"],
+            "location": "New York City",
+            "job_type": "Full Time",
+            "job_description": "Distributed task queue.",
+        }
+        comment = {"id": 1, "time": 1720000000, "text": "Hatchet | NYC"}
+        with tempfile.TemporaryDirectory() as tmp:
+            raw = os.path.join(tmp, "raw.json")
+            output = os.path.join(tmp, "classified.json")
+            with open(raw, "w") as f:
+                json.dump({"post": {}, "comments": [comment]}, f)
+            with open(output, "w") as f:
+                json.dump(
+                    {
+                        "post": {},
+                        "classified_comments": [
+                            {"original": comment, "classified": classified}
+                        ],
+                    },
+                    f,
+                )
+
+            loaded = self.run_hnjobs("extract", "--input", raw, "--output", output)
+            self.assertEqual(loaded, [])
+            loaded = self.run_hnjobs(
+                "export", "--input", output, "--output", os.path.join(tmp, "out.csv")
+            )
+            self.assertEqual(loaded, [])
+
+    def test_pipeline(self):
+        story = {"id": 1, "type": "story", "title": "Who is hiring?", "kids": [10, 11]}
+        comments = {
+            10: {"id": 10, "type": "comment", "time": 1720000000, "text": "A | NYC"},
+            11: {"id": 11, "type": "comment", "time": 1720000100, "text": "B | SF"},
+        }
+        classified = {
+            "company_name": "Hatchet",
+            "positions": ["Founding Engineer"],
+            "location": "New York City",
+            "job_type": "Full Time",
+            "job_description": "Distributed task queue.",
+        }
+
+        def get_item(item_id):
+            return story if str(item_id) == "1" else comments[item_id]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            prefix = os.path.join(tmp, "202408")
+            # Every comment is already classified, so extract runs from the cache.
+            with open(f"{prefix}_classified.json", "w") as f:
+                json.dump(
+                    {
+                        "post": {},
+                        "classified_comments": [
+                            {"original": comment, "classified": classified}
+                            for comment in comments.values()
+                        ],
+                    },
+                    f,
+                )
+
+            url = "https://news.ycombinator.com/item?id=1"
+            with patch("crawl.get_item", side_effect=get_item), patch(
+                "crawl.time.sleep"
+            ):
+                self.assertIsNone(pipeline(["--url", url, "--prefix", prefix]))
+
+            with open(f"{prefix}_raw.json") as f:
+                self.assertEqual(len(json.load(f)["comments"]), 2)
+            with open(f"{prefix}_classified.json") as f:
+                self.assertEqual(len(json.load(f)["classified_comments"]), 2)
+            with open(f"{prefix}_classified.csv") as f:
+                self.assertEqual(len(f.read().strip().splitlines()), 3)
+
+    def test_pipeline_failure(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            prefix = os.path.join(tmp, "202408")
+            self.assertEqual(
+                pipeline(["--url", "https://example.com/item?id=1", "--prefix", prefix]),
+                1,
+            )
+            self.assertFalse(os.path.exists(f"{prefix}_classified.csv"))
+
+            # Crawl writes an empty result for a missing story, which extract rejects.
+            with patch("crawl.get_item", return_value=None):
+                self.assertEqual(
+                    pipeline(
+                        [
+                            "--url",
+                            "https://news.ycombinator.com/item?id=1",
+                            "--prefix",
+                            prefix,
+                        ]
+                    ),
+                    1,
+                )
+            self.assertTrue(os.path.exists(f"{prefix}_raw.json"))
+            self.assertFalse(os.path.exists(f"{prefix}_classified.csv"))
+
+    def test_failing_subcommands_exit_nonzero(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            missing = os.path.join(tmp, "missing.json")
+            output = os.path.join(tmp, "classified.json")
+            extract = ["extract", "--input", missing, "--output", output]
+            self.assertEqual(main(extract), 1)
+            self.assertEqual(main(["crawl", "--url", "https://example.com/x?id=1"]), 1)
+
+            # The same exit code reaches the shell.
+            result = subprocess.run(
+                [sys.executable, "hnjobs.py", *extract], cwd=HERE, capture_output=True
+            )
+            self.assertEqual(result.returncode, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+"""
+Scheduling of extraction work: priority order, cost budget and deadline.
+
+Comments are dispatched best-first according to a priority function. Dispatch
+stops as soon as the estimated spend would exceed the budget or the deadline
+has passed; anything not dispatched is reported as pending, and a later run
+against the same output file picks it up through the extractor's cache.
+"""
+
+import heapq
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Rough heuristic for English text, good enough for budgeting purposes.
+CHARS_PER_TOKEN = 4
+
+# USD per million tokens for claude-3-5-sonnet.
+INPUT_COST_PER_MTOK = 3.0
+OUTPUT_COST_PER_MTOK = 15.0
+
+REMOTE_PATTERN = re.compile(r"\bremote\b", re.IGNORECASE)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def estimate_cost(input_tokens: int, output_tokens: int) -> float:
+    return (
+        input_tokens * INPUT_COST_PER_MTOK + output_tokens * OUTPUT_COST_PER_MTOK
+    ) / 1_000_000
+
+
+def header_line(comment: Dict[str, Any]) -> str:
+    # HN comment text is HTML; the "Company | Location | REMOTE" line comes
+    # before the first paragraph break.
+    return comment.get("text", "").split("<p>", 1)[0]
+
+
+def priority_file(comment: Dict[str, Any]) -> float:
+    return 0
+
+
+def priority_recent(comment: Dict[str, Any]) -> float:
+    return -comment.get("time", 0)
+
+
+def priority_remote(comment: Dict[str, Any]) -> float:
+    return 0 if REMOTE_PATTERN.search(header_line(comment)) else 1
+
+
+def priority_short(comment: Dict[str, Any]) -> float:
+    return len(comment.get("text", ""))
+
+
+# Lower value is dispatched first; ties keep file order.
+PRIORITIES: Dict[str, Callable[[Dict[str, Any]], float]] = {
+    "file": priority_file,
+    "recent": priority_recent,
+    "remote": priority_remote,
+    "short": priority_short,
+}
+
+
+class Scheduler:
+    """Hands out comments in priority order while budget and time remain.
+
+    `prompt_tokens` is the fixed prompt overhead added to every request and
+    `max_output_tokens` the per-request output cap. A request is only
+    dispatched if its worst case (full output cap) still fits in the budget;
+    once it completes, the reservation is replaced by an estimate of what it
+    actually produced. A `max_cost` or `deadline` of 0 means unlimited.
+    """
+
+    def __init__(
+        self,
+        comments: List[Dict[str, Any]],
+        priority: str = "file",
+        max_cost: float = 0.0,
+        deadline: float = 0.0,
+        prompt_tokens: int = 0,
+        max_output_tokens: int = 1024,
+    ):
+        if priority not in PRIORITIES:
+            raise ValueError(
+                f"Unknown priority '{priority}', expected one of {sorted(PRIORITIES)}"
+            )
+        key = PRIORITIES[priority]
+        self._queue: List[Tuple[float, int, Dict[str, Any]]] = [
+            (key(comment), index, comment) for index, comment in enumerate(comments)
+        ]
+        heapq.heapify(self._queue)
+        self.max_cost = max_cost
+        self.deadline_at = time.monotonic() + deadline if deadline > 0 else None
+        self.prompt_tokens = prompt_tokens
+        self.max_output_tokens = max_output_tokens
+        self.spent = 0.0
+        self._reserved: Dict[Any, float] = {}
+        self.stop_reason: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def _input_tokens(self, comment: Dict[str, Any]) -> int:
+        return self.prompt_tokens + estimate_tokens(comment.get("text", ""))
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left until the deadline, or None if there is no deadline."""
+        if self.deadline_at is None:
+            return None
+        return max(self.deadline_at - time.monotonic(), 0.0)
+
+    def committed(self) -> float:
+        return self.spent + sum(self._reserved.values())
+
+    def next(self) -> Optional[Dict[str, Any]]:
+        """Pop the next comment, or None if nothing can be dispatched right now.
+
+        `stop_reason` is set once dispatch is over for good; while it is unset
+        and the queue is non-empty, call again after the next `settle`.
+        """
+        if self.stop_reason or not self._queue:
+            return None
+        if self.deadline_at is not None and time.monotonic() >= self.deadline_at:
+            self.stop_reason = "deadline"
+            return None
+
+        comment = self._queue[0][2]
+        reservation = estimate_cost(self._input_tokens(comment), self.max_output_tokens)
+        if self.max_cost > 0 and self.committed() + reservation > self.max_cost:
+            # Running requests may settle for much less than they reserved,
+            # so only give up once nothing is in flight.
+            if not self._reserved:
+                self.stop_reason = "budget"
+            return None
+
+        heapq.heappop(self._queue)
+        self._reserved[comment["id"]] = reservation
+        return comment
+
+    def settle(self, comment: Dict[str, Any], output_text: str):
+        """Replace a comment's reservation with its estimated actual cost."""
+        if self._reserved.pop(comment["id"], None) is None:
+            return
+        self.spent += estimate_cost(
+            self._input_tokens(comment),
+            min(estimate_tokens(output_text), self.max_output_tokens),
+        )
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """Comments that were never dispatched, in priority order."""
+        return [comment for _, _, comment in sorted(self._queue)]
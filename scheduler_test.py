@@ -0,0 +1,87 @@
+import unittest
+from unittest.mock import patch
+from scheduler import Scheduler, estimate_cost
+
+
+class TestScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.comments = [
+            {"id": 1, "time": 100, "text": "Acme | Berlin | ONSITE<p>" + "x" * 400},
+            {"id": 2, "time": 300, "text": "Foo | REMOTE (US)<p>Short."},
+            {"id": 3, "time": 200, "text": "Bar | NYC<p>" + "y" * 40},
+        ]
+
+    def drain(self, scheduler):
+        ids = []
+        while (comment := scheduler.next()) is not None:
+            ids.append(comment["id"])
+        return ids
+
+    def test_priorities(self):
+        self.assertEqual(self.drain(Scheduler(self.comments, "file")), [1, 2, 3])
+        self.assertEqual(self.drain(Scheduler(self.comments, "recent")), [2, 3, 1])
+        self.assertEqual(self.drain(Scheduler(self.comments, "remote")), [2, 1, 3])
+        self.assertEqual(self.drain(Scheduler(self.comments, "short")), [2, 3, 1])
+
+    def test_unknown_priority(self):
+        with self.assertRaises(ValueError):
+            Scheduler(self.comments, "random")
+
+    def test_budget_leaves_pending(self):
+        # Enough for a single worst-case request only.
+        max_cost = estimate_cost(20, 100) * 1.5
+        scheduler = Scheduler(
+            self.comments, "short", max_cost=max_cost, max_output_tokens=100
+        )
+        first = scheduler.next()
+        self.assertEqual(first["id"], 2)
+        self.assertIsNone(scheduler.next())
+        self.assertIsNone(scheduler.stop_reason)
+
+        # Used its full output cap, so nothing else fits once it settles.
+        scheduler.settle(first, "x" * 1000)
+        self.assertIsNone(scheduler.next())
+        self.assertEqual(scheduler.stop_reason, "budget")
+        self.assertEqual([c["id"] for c in scheduler.pending()], [3, 1])
+
+    def test_settle_releases_reservation(self):
+        max_cost = estimate_cost(20, 100) * 1.5
+        scheduler = Scheduler(
+            self.comments, "short", max_cost=max_cost, max_output_tokens=100
+        )
+        first = scheduler.next()
+        scheduler.settle(first, "{}")
+        self.assertLess(scheduler.spent, estimate_cost(20, 100))
+        self.assertEqual(scheduler.next()["id"], 3)
+
+    def test_dispatch_resumes_after_settle(self):
+        max_cost = estimate_cost(20, 100) * 1.5
+        scheduler = Scheduler(
+            self.comments, "short", max_cost=max_cost, max_output_tokens=100
+        )
+        in_flight = self.drain(scheduler)
+        self.assertEqual(in_flight, [2])
+        self.assertIsNone(scheduler.stop_reason)
+
+        scheduler.settle({"id": 2, "text": self.comments[1]["text"]}, "{}")
+        self.assertEqual(self.drain(scheduler), [3])
+        scheduler.settle(self.comments[2], "{}")
+        self.assertEqual(self.drain(scheduler), [1])
+        self.assertEqual(scheduler.pending(), [])
+
+    def test_deadline(self):
+        with patch("scheduler.time.monotonic", return_value=0.0):
+            scheduler = Scheduler(self.comments, deadline=10)
+            self.assertEqual(scheduler.next()["id"], 1)
+        with patch("scheduler.time.monotonic", return_value=11.0):
+            self.assertIsNone(scheduler.next())
+        self.assertEqual(scheduler.stop_reason, "deadline")
+        with patch("scheduler.time.monotonic", return_value=4.0):
+            self.assertEqual(scheduler.remaining(), 6.0)
+        self.assertIsNone(Scheduler(self.comments).remaining())
+        self.assertEqual(len(scheduler.pending()), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,258 @@
+"""
+Lightweight instrumentation shared by crawl.py, extractor.py and write_jobs_to_csv.py.
+
+Provides named timing spans, per-stage counters, an optional Chrome
+trace-event JSON file (open it in chrome://tracing or https://ui.perfetto.dev
+to see worker threads over time), and optional cProfile/tracemalloc capture.
+Everything is a no-op until `session` enables it, so the instrumented code
+pays only a function call and a flag check per span when tracing is off.
+
+Example:
+    with tracing.span("extract.api", id=comment_id):
+        ...
+    tracing.count("extract.errors")
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+_enabled = False
+_lock = threading.Lock()
+_events: List[Dict[str, Any]] = []
+_counters: Counter = Counter()
+_thread_names: Dict[int, str] = {}
+# Per-thread cProfile profilers, merged into the session's profile at the end.
+_profiling = False
+_session_thread: Optional[int] = None
+_thread_profiles: Dict[int, Any] = {}
+_origin = time.perf_counter()
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name: str, args: Dict[str, Any]):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _record(self.name, self.start, time.perf_counter(), self.args)
+        return False
+
+
+def _record(name: str, start: float, end: float, args: Dict[str, Any]):
+    event = {
+        "name": name,
+        "cat": name.split(".", 1)[0],
+        "ph": "X",
+        "ts": (start - _origin) * 1e6,
+        "dur": (end - start) * 1e6,
+        "pid": os.getpid(),
+        "tid": threading.get_ident(),
+    }
+    if args:
+        event["args"] = args
+    with _lock:
+        _events.append(event)
+        _thread_names[event["tid"]] = threading.current_thread().name
+
+
+def _reset():
+    with _lock:
+        _events.clear()
+        _counters.clear()
+        _thread_names.clear()
+        _thread_profiles.clear()
+
+
+def span(name: str, **args):
+    """Time the enclosed block under `name`; extra keyword args go into the trace."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def record(name: str, start: float, end: float, **args):
+    """Add a span whose `time.perf_counter()` bounds were measured elsewhere,
+    e.g. from callbacks that cannot wrap the code in a `with` block."""
+    if not _enabled:
+        return
+    _record(name, start, end, args)
+
+
+def count(name: str, n: int = 1):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] += n
+
+
+@contextmanager
+def profile_thread():
+    """Profile the enclosed block with cProfile when it runs on a worker thread.
+
+    The session's profiler only sees the thread that opened it, so worker
+    code should wrap its body in this to appear in the --profile summary.
+    """
+    tid = threading.get_ident()
+    if not _profiling or tid == _session_thread:
+        yield
+        return
+
+    with _lock:
+        profiler = _thread_profiles.get(tid)
+    if profiler is None:
+        import cProfile
+
+        profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Python 3.12+ allows one profiler per process, and it already
+        # covers every thread.
+        yield
+        return
+    with _lock:
+        _thread_profiles[tid] = profiler
+    try:
+        yield
+    finally:
+        profiler.disable()
+
+
+def add_arguments(parser):
+    parser.add_argument(
+        "--trace",
+        help="Path to write a Chrome trace-event JSON file of timing spans",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Capture cProfile and tracemalloc statistics and log a summary",
+    )
+
+
+def summary() -> str:
+    with _lock:
+        events = list(_events)
+        counters = dict(_counters)
+
+    totals = defaultdict(lambda: [0, 0.0])
+    for event in events:
+        totals[event["name"]][0] += 1
+        totals[event["name"]][1] += event["dur"] / 1e3
+
+    lines = [f"{'span':<32}{'count':>8}{'total ms':>12}{'mean ms':>10}"]
+    for name, (n, total) in sorted(totals.items(), key=lambda kv: -kv[1][1]):
+        lines.append(f"{name:<32}{n:>8}{total:>12.1f}{total / n:>10.2f}")
+    for name, value in sorted(counters.items()):
+        lines.append(f"{name:<32}{value:>8}")
+    return "\n".join(lines)
+
+
+def write_trace(path: str):
+    with _lock:
+        events = list(_events)
+        counters = dict(_counters)
+        thread_names = dict(_thread_names)
+
+    pid = os.getpid()
+    metadata = [
+        {
+            "name": "thread_name",
+            "ph": "M",
+            "pid": pid,
+            "tid": tid,
+            "args": {"name": name},
+        }
+        for tid, name in thread_names.items()
+    ]
+    with open(path, "w") as f:
+        json.dump({"traceEvents": metadata + events, "otherData": counters}, f)
+    logging.info(f"Trace written to {path}")
+
+
+@contextmanager
+def session(trace_path: Optional[str] = None, profile: bool = False):
+    """Enable instrumentation for the enclosed block if tracing or profiling.
+
+    Worker threads show up in the cProfile summary only for code wrapped in
+    `profile_thread`.
+    """
+    global _enabled, _origin, _profiling, _session_thread
+    if not trace_path and not profile:
+        yield
+        return
+
+    _reset()
+    _origin = time.perf_counter()
+    _enabled = True
+
+    profiler = None
+    if profile:
+        import cProfile
+        import io
+        import pstats
+        import tracemalloc
+
+        tracemalloc.start()
+        profiler = cProfile.Profile()
+        profiler.enable()
+        _session_thread = threading.get_ident()
+        _profiling = True
+
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            _profiling = False
+            profiler.disable()
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            stream = io.StringIO()
+            stats = pstats.Stats(profiler, stream=stream)
+            with _lock:
+                thread_profiles = list(_thread_profiles.values())
+            for thread_profile in thread_profiles:
+                stats.add(thread_profile)
+            stats.sort_stats("cumulative").print_stats(20)
+            logging.info(
+                f"cProfile (top 20 by cumulative time, "
+                f"{len(thread_profiles) + 1} threads):\n{stream.getvalue()}"
+            )
+            top = "\n".join(
+                str(stat) for stat in snapshot.statistics("lineno")[:10]
+            )
+            logging.info(
+                f"tracemalloc: current {current / 1e6:.1f} MB, "
+                f"peak {peak / 1e6:.1f} MB, top allocations:\n{top}"
+            )
+
+        _enabled = False
+        logging.info(f"Timing summary:\n{summary()}")
+        if trace_path:
+            write_trace(trace_path)
+        _reset()
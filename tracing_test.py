@@ -0,0 +1,68 @@
+import unittest
+import json
+import tempfile
+import threading
+import tracing
+
+
+class TestTracing(unittest.TestCase):
+
+    def setUp(self):
+        tracing._reset()
+
+    def test_disabled_records_nothing(self):
+        with tracing.span("test.noop"):
+            tracing.count("test.calls")
+        self.assertEqual(tracing._events, [])
+        self.assertEqual(tracing._counters, {})
+
+    def test_session_writes_trace(self):
+        with tempfile.NamedTemporaryFile(mode="w+", suffix=".json") as trace_file:
+            with tracing.session(trace_file.name):
+                with tracing.span("test.main", step=1):
+                    tracing.count("test.calls", 2)
+                worker = threading.Thread(
+                    target=lambda: tracing.span("test.worker").__enter__().__exit__(),
+                    name="worker-0",
+                )
+                worker.start()
+                worker.join()
+
+            trace = json.load(trace_file)
+
+        spans = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+        self.assertEqual([e["name"] for e in spans], ["test.main", "test.worker"])
+        self.assertEqual(spans[0]["args"], {"step": 1})
+        self.assertNotEqual(spans[0]["tid"], spans[1]["tid"])
+        thread_names = [
+            e["args"]["name"] for e in trace["traceEvents"] if e["ph"] == "M"
+        ]
+        self.assertIn("worker-0", thread_names)
+        self.assertEqual(trace["otherData"], {"test.calls": 2})
+
+        # Instrumentation is off and cleared again once the session ends.
+        self.assertIs(tracing.span("test.after"), tracing._NULL_SPAN)
+        self.assertEqual(tracing._events, [])
+        self.assertEqual(tracing._counters, {})
+
+    def test_profile_includes_worker_threads(self):
+        def worker_only_function():
+            return sum(range(1000))
+
+        def worker():
+            with tracing.profile_thread():
+                worker_only_function()
+
+        with self.assertLogs(level="INFO") as logs:
+            with tracing.session(profile=True):
+                thread = threading.Thread(target=worker)
+                thread.start()
+                thread.join()
+
+        profile_log = next(line for line in logs.output if "cProfile" in line)
+        self.assertIn("worker_only_function", profile_log)
+        self.assertEqual(tracing._thread_profiles, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
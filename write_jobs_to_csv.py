@@ -4,7 +4,7 @@ import argparse
 import logging
 from typing import Dict, Any, List
 from datetime import datetime
-from models import JobPosting
+import tracing
 
 # Set up logging
 logging.basicConfig(
@@ -17,88 +17,164 @@ def load_json(file_path: str) -> Dict[str, Any]:
         return json.load(f)
 
 
+# Mirrors models.JobPosting, checked here instead of validating with pydantic,
+# which is only imported when --validate is given.
+REQUIRED_FIELDS = ["company_name", "positions", "location", "job_type", "job_description"]
+STRING_FIELDS = ["company_name", "location", "job_description"]
+OPTIONAL_STRING_FIELDS = [
+    "salary_range",
+    "work_environment",
+    "application_instructions",
+    "timezone",
+    "industry",
+    "year_of_experience",
+]
+LIST_FIELDS = ["positions", "benefits", "required_skills", "additional_requirements"]
+BOOL_FIELDS = [
+    "is_remote",
+    "is_remote_in_us",
+    "is_remote_global",
+    "is_ml",
+    "is_datacenter",
+]
+JOB_TYPES = ["Full Time", "Part Time", "Contractor", "Unknown"]
+STARTUP_SERIES = [
+    "Series A",
+    "Series B",
+    "Series C",
+    "Series D",
+    "Series E",
+    "Public Company",
+    "Unknown",
+]
+
+
 def format_timestamp(timestamp: int) -> str:
     return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
 
 
 def flatten_job_posting(
-    job_posting: JobPosting, original: Dict[str, Any]
+    job_posting: Dict[str, Any], original: Dict[str, Any]
 ) -> Dict[str, str]:
     return {
         "URL": f'https://news.ycombinator.com/item?id={original["id"]}',
         "Time": format_timestamp(original["time"]),
-        "Company Name": job_posting.company_name,
-        "Positions": ", ".join(job_posting.positions),
-        "Location": job_posting.location,
-        "Job Type": job_posting.job_type,
-        "Salary Range": job_posting.salary_range or "",
-        "Benefits": ", ".join(job_posting.benefits),
-        "Required Skills": ", ".join(job_posting.required_skills),
-        "Additional Requirements": ", ".join(job_posting.additional_requirements),
-        "Work Environment": job_posting.work_environment or "",
-        "Application Instructions": job_posting.application_instructions or "",
-        "Is Remote": str(job_posting.is_remote),
-        "Is Remote in US": str(job_posting.is_remote_in_us),
-        "Is Remote Global": str(job_posting.is_remote_global),
-        "Timezone": job_posting.timezone or "",
-        "Industry": job_posting.industry or "",
-        "Startup Series": job_posting.startup_series,
-        "Is ML": str(job_posting.is_ml),
-        "Is Datacenter": str(job_posting.is_datacenter),
-        "Years of Experience": job_posting.year_of_experience or "",
-        "Job Description": job_posting.job_description,
+        "Company Name": job_posting["company_name"],
+        "Positions": ", ".join(job_posting["positions"]),
+        "Location": job_posting["location"],
+        "Job Type": job_posting["job_type"],
+        "Salary Range": job_posting.get("salary_range") or "",
+        "Benefits": ", ".join(job_posting.get("benefits") or []),
+        "Required Skills": ", ".join(job_posting.get("required_skills") or []),
+        "Additional Requirements": ", ".join(
+            job_posting.get("additional_requirements") or []
+        ),
+        "Work Environment": job_posting.get("work_environment") or "",
+        "Application Instructions": job_posting.get("application_instructions")
+        or "",
+        "Is Remote": str(job_posting.get("is_remote", False)),
+        "Is Remote in US": str(job_posting.get("is_remote_in_us", False)),
+        "Is Remote Global": str(job_posting.get("is_remote_global", False)),
+        "Timezone": job_posting.get("timezone") or "",
+        "Industry": job_posting.get("industry") or "",
+        "Startup Series": job_posting.get("startup_series", "Unknown"),
+        "Is ML": str(job_posting.get("is_ml", False)),
+        "Is Datacenter": str(job_posting.get("is_datacenter", False)),
+        "Years of Experience": job_posting.get("year_of_experience") or "",
+        "Job Description": job_posting["job_description"],
         "Original Text": original.get("text", ""),
     }
 
 
-def json_to_csv(json_file: str, csv_file: str):
+def check_job_posting(job_posting: Dict[str, Any], validate: bool) -> Dict[str, Any]:
+    if validate:
+        from models import JobPosting
+
+        return JobPosting.model_validate(job_posting).model_dump()
+    if "error" in job_posting:
+        raise ValueError(job_posting["error"])
+    missing = [field for field in REQUIRED_FIELDS if field not in job_posting]
+    if missing:
+        raise ValueError(f"Missing fields: {', '.join(missing)}")
+
+    for field in STRING_FIELDS:
+        if not isinstance(job_posting[field], str):
+            raise ValueError(f"{field} must be a string")
+    for field in OPTIONAL_STRING_FIELDS:
+        if not isinstance(job_posting.get(field, ""), (str, type(None))):
+            raise ValueError(f"{field} must be a string or null")
+    for field in LIST_FIELDS:
+        value = job_posting.get(field, [])
+        if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+            raise ValueError(f"{field} must be a list of strings")
+    for field in BOOL_FIELDS:
+        if not isinstance(job_posting.get(field, False), bool):
+            raise ValueError(f"{field} must be a boolean")
+    if job_posting["job_type"] not in JOB_TYPES:
+        raise ValueError(f"Unknown job_type: {job_posting['job_type']}")
+    if job_posting.get("startup_series", "Unknown") not in STARTUP_SERIES:
+        raise ValueError(f"Unknown startup_series: {job_posting['startup_series']}")
+    return job_posting
+
+
+def json_to_csv(json_file: str, csv_file: str, validate: bool = False):
     # Load the JSON data
-    data = load_json(json_file)
+    with tracing.span("export.load_json"):
+        data = load_json(json_file)
 
-    # Parse the classified comments into JobPosting objects
-    classified_comments: List[Dict[str, Any]] = []
+    # Flatten each classification, dropping failed or malformed ones
+    headers: List[str] = []
+    rows = []
     for item in data["classified_comments"]:
         try:
-            job_posting = JobPosting.model_validate(item["classified"])
-            classified_comments.append(
-                {"original": item["original"], "classified": job_posting}
-            )
+            with tracing.span("export.validate"):
+                job_posting = check_job_posting(item["classified"], validate)
+            with tracing.span("export.flatten"):
+                flattened = flatten_job_posting(job_posting, item["original"])
         except Exception as e:
             logging.error(f"Error parsing job posting: {e}")
+            tracing.count("export.invalid")
             continue
+        if not headers:
+            headers = list(flattened.keys())
+        rows.append([flattened[header] for header in headers])
 
-    if not classified_comments:
+    if not rows:
         logging.error("No valid job postings found.")
         return
 
-    # Prepare the data for CSV
-    headers = list(
-        flatten_job_posting(
-            classified_comments[0]["classified"], classified_comments[0]["original"]
-        ).keys()
-    )
-    rows = []
-    for item in classified_comments:
-        flattened = flatten_job_posting(item["classified"], item["original"])
-        rows.append([flattened[header] for header in headers])
-
     # Write to CSV
-    with open(csv_file, "w", newline="", encoding="utf-8") as f:
+    with tracing.span("export.write_csv"), open(
+        csv_file, "w", newline="", encoding="utf-8"
+    ) as f:
         writer = csv.writer(f)
         writer.writerow(headers)
         writer.writerows(rows)
+    tracing.count("export.rows", len(rows))
 
     logging.info(f"CSV file created: {csv_file}")
     logging.info(f"Total rows written: {len(rows)}")
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Convert JSON file to CSV")
+def add_arguments(parser):
+    """Options for json_to_csv, shared with `hnjobs pipeline`."""
+    parser.add_argument(
+        "--validate",
+        action="store_true",
+        help="Validate every posting against the pydantic JobPosting model",
+    )
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Convert JSON file to CSV")
     parser.add_argument("--input", required=True, help="Path to the input JSON file")
     parser.add_argument("--output", required=True, help="Path to the output CSV file")
-    args = parser.parse_args()
+    add_arguments(parser)
+    tracing.add_arguments(parser)
+    args = parser.parse_args(argv)
 
-    json_to_csv(args.input, args.output)
+    with tracing.session(args.trace, args.profile):
+        json_to_csv(args.input, args.output, args.validate)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,82 @@
+import unittest
+import csv
+import json
+import os
+import tempfile
+import typing
+from models import JobPosting
+import write_jobs_to_csv
+from write_jobs_to_csv import json_to_csv
+
+
+class TestWriteJobsToCsv(unittest.TestCase):
+
+    def setUp(self):
+        self.valid = {
+            "company_name": "Hatchet",
+            "positions": ["Founding Engineer"],
+            "location": "New York City",
+            "job_type": "Full Time",
+            "job_description": "Distributed task queue.",
+            "is_remote": False,
+        }
+
+    def export(self, classified, validate=False):
+        items = [
+            {"original": {"id": i, "time": 1720000000, "text": ""}, "classified": c}
+            for i, c in enumerate(classified)
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            json_file = os.path.join(tmp, "classified.json")
+            csv_file = os.path.join(tmp, "classified.csv")
+            with open(json_file, "w") as f:
+                json.dump({"post": {}, "classified_comments": items}, f)
+            json_to_csv(json_file, csv_file, validate)
+            if not os.path.exists(csv_file):
+                return None
+            with open(csv_file, newline="", encoding="utf-8") as f:
+                return list(csv.DictReader(f))
+
+    def test_malformed_rows_are_skipped(self):
+        classified = [
+            {"error": "API error"},
+            {**self.valid, "positions": None},
+            {**self.valid, "job_type": "Internship"},
+            {**self.valid, "startup_series": "Seed"},
+            {**self.valid, "is_remote": "sometimes"},
+            {**self.valid, "company_name": None},
+            self.valid,
+        ]
+        for validate in (False, True):
+            rows = self.export(classified, validate)
+            self.assertEqual([row["URL"][-1] for row in rows], ["6"])
+            self.assertEqual(rows[0]["Positions"], "Founding Engineer")
+            self.assertEqual(rows[0]["Startup Series"], "Unknown")
+
+    def test_no_valid_rows(self):
+        self.assertIsNone(self.export([{**self.valid, "positions": None}]))
+
+    def test_fields_match_model(self):
+        fields = JobPosting.model_fields
+        required = [name for name, field in fields.items() if field.is_required()]
+        self.assertEqual(sorted(write_jobs_to_csv.REQUIRED_FIELDS), sorted(required))
+        self.assertEqual(
+            list(typing.get_args(fields["job_type"].annotation)),
+            write_jobs_to_csv.JOB_TYPES,
+        )
+        self.assertEqual(
+            list(typing.get_args(fields["startup_series"].annotation)),
+            write_jobs_to_csv.STARTUP_SERIES,
+        )
+        checked = (
+            write_jobs_to_csv.STRING_FIELDS
+            + write_jobs_to_csv.OPTIONAL_STRING_FIELDS
+            + write_jobs_to_csv.LIST_FIELDS
+            + write_jobs_to_csv.BOOL_FIELDS
+            + ["job_type", "startup_series"]
+        )
+        self.assertEqual(sorted(checked), sorted(fields))
+
+
+if __name__ == "__main__":
+    unittest.main()